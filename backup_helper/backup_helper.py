@@ -2,7 +2,10 @@ import sys
 import os
 import dataclasses
 import json
+import gzip
+import hashlib
 import contextlib
+import shutil
 import logging
 import time
 
@@ -11,46 +14,102 @@ from typing import (
     Iterator, Iterable, TYPE_CHECKING, Tuple, overload
 )
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
 from backup_helper import helpers
 from backup_helper.exceptions import (
     SourceNotFound, TargetNotFound,
-    SourceAlreadyExists, AliasAlreadyExists,
+    SourceAlreadyExists, AliasAlreadyExists, UnsupportedStateVersion,
 )
 from backup_helper.source import Source
-from backup_helper.target import Target
+# re-exported: `from backup_helper.backup_helper import Target` is public API
+from backup_helper.target import Target  # noqa: F401
 from backup_helper import work
 
 logger = logging.getLogger(__name__)
 
+_GZIP_MAGIC = b'\x1f\x8b'
+# 2: Sources/Targets no longer carry their own "version"/"type" header,
+#    version 1 files still load, since those keys are ignored
+STATE_VERSION = 2
+_SUPPORTED_STATE_VERSIONS = (1, 2)
+
+
+def _dumps_state(d: Dict[str, Any]) -> bytes:
+    # compact, since this is written after every command; use
+    # `status` for a human-readable version
+    if orjson is not None:
+        try:
+            return orjson.dumps(d)
+        except orjson.JSONEncodeError:
+            # orjson rejects strings with lone surrogates, e.g. paths that
+            # aren't valid UTF-8 -> stdlib escapes them
+            pass
+    # NOTE: keep ensure_ascii, paths that aren't valid UTF-8 are decoded
+    # into lone surrogates (see os.fsdecode), which can't be encoded as UTF-8
+    # but round-trip fine as \uXXXX escapes
+    return json.dumps(d, separators=(',', ':')).encode('ascii')
+
+
+def _loads_state(contents: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(contents)
+        except orjson.JSONDecodeError:
+            # might be escaped lone surrogates written by the stdlib
+            # encoder, which orjson refuses to decode
+            pass
+    return json.loads(contents)
+
+
+def _state_fingerprint(contents: bytes) -> bytes:
+    return hashlib.blake2b(contents, digest_size=16).digest()
+
 
 class BackupHelper:
     def __init__(self, sources: List[Source]):
-        self._sources = {}
+        # keyed by path only, aliases are resolved through `_source_aliases`
+        self._sources: Dict[str, Source] = {}
+        # maps alias -> path
+        self._source_aliases: Dict[str, str] = {}
         # don't serialize this, will be set when loading, so the file can be moved!
         self._working_dir = '.'
+        # path and fingerprint of the state as last loaded/saved, so
+        # saving an unchanged state doesn't rewrite the whole file
+        self._last_saved: Optional[Tuple[str, bytes]] = None
         for source in sources:
             self._sources[source.path] = source
             if source.alias:
-                self._sources[source.alias] = source
+                self._source_aliases[source.alias] = source.path
         self._queue = work.setup_work_queue([])
 
     @ classmethod
     def load_state(cls, path: str) -> 'BackupHelper':
-        if os.path.exists(path):
-            with open(path, "r", encoding='utf-8') as f:
+        try:
+            with open(path, "rb") as f:
                 contents = f.read()
-            bh = cls.from_json(contents)
-            bh._working_dir = os.path.dirname(path)
-            return bh
+        except FileNotFoundError:
+            contents = b''
+
+        if not contents:
+            bh = cls([])
         else:
-            return cls([])
+            if contents[:2] == _GZIP_MAGIC:
+                contents = gzip.decompress(contents)
+            bh = cls.from_json(contents)
+            bh._last_saved = (path, _state_fingerprint(contents))
+        # also for new/empty status files, so logs end up next to it
+        bh._working_dir = os.path.dirname(path)
+        return bh
 
     def to_json(self) -> Dict[Any, Any]:
-        result = {"version": 1, "type": type(self).__name__}
+        result: Dict[str, Any] = {
+            "version": STATE_VERSION, "type": "BackupHelper"}
 
         sources: List[Dict[str, Any]] = []
-        # sources contain both path as well as alias as keys, so we have to
-        # deduplicate them
         for source in self.unique_sources():
             sources.append(source.to_json())
 
@@ -59,61 +118,88 @@ class BackupHelper:
         return result
 
     @ staticmethod
-    def from_json(json_str: str) -> 'BackupHelper':
-        d = json.loads(json_str, object_hook=BackupHelper.from_json_hook)
-        return d
-
-    @ staticmethod
-    def from_json_hook(json_object: Dict[Any, Any]) -> Union[
-            'BackupHelper', Source, Target, Dict[Any, Any]]:
-        # if this is used as object_hook in json_loads it
-        # will call the method iteratively as it builds the object bottom up
-
-        if "type" not in json_object:
-            return json_object
-
-        # version = json_object["version"]
-        obj_type = json_object["type"]
-
-        # dispatch to appropriate from_json method
-        if obj_type == "BackupHelper":
-            sources = json_object["sources"]
-            return BackupHelper(sources)
-        elif obj_type == "Source":
-            return Source.from_json(json_object)
-        elif obj_type == "Target":
-            return Target.from_json(json_object)
-        else:
-            return json_object
+    def from_json(json_str: Union[str, bytes]) -> 'BackupHelper':
+        # decode into plain dicts first and then build the objects top-down,
+        # instead of dispatching every decoded JSON object through an
+        # `object_hook`
+        d = _loads_state(json_str)
+        version = d.get("version")
+        if version not in _SUPPORTED_STATE_VERSIONS:
+            raise UnsupportedStateVersion(
+                f"Unsupported state file version '{version}', this version "
+                f"of backup_helper supports: "
+                f"{', '.join(str(v) for v in _SUPPORTED_STATE_VERSIONS)}",
+                version)
+        return BackupHelper([Source.from_json(s) for s in d["sources"]])
 
     def unique_sources(self) -> Iterator[Source]:
-        # sources contain both path as well as alias as keys, so we have to
-        # deduplicate them
-        yield from helpers.unique_iterator(self._sources.values())
+        yield from self._sources.values()
+
+    def source_keys(self) -> Iterator[str]:
+        """All keys a source can be addressed by: paths and aliases"""
+        yield from self._sources.keys()
+        yield from self._source_aliases.keys()
 
     def save_state(self, path: str):
-        d = self.to_json()
-        with open(path, "w", encoding='utf-8') as f:
-            f.write(json.dumps(d, indent=2))
+        contents = _dumps_state(self.to_json())
+        fingerprint = _state_fingerprint(contents)
+        if self._last_saved == (path, fingerprint):
+            # nothing changed since the last load/save
+            return
+
+        # write to a temporary file first and then swap it in, so getting
+        # killed while writing can't leave a truncated state file behind;
+        # replace the file a symlink points to instead of the link itself
+        real_path = os.path.realpath(path) if os.path.islink(path) else path
+        tmp_path = f"{real_path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                if path.endswith(".gz"):
+                    # level 1 since most of the gain is there at a fraction
+                    # of the cost
+                    f.write(gzip.compress(contents, compresslevel=1))
+                else:
+                    f.write(contents)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(real_path):
+                # os.replace would use the tmp file's default permissions
+                shutil.copymode(real_path, tmp_path)
+            os.replace(tmp_path, real_path)
+        except BaseException:
+            # also on KeyboardInterrupt, don't leave the tmp file behind
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._last_saved = (path, fingerprint)
 
     def add_source(self, source: Source):
-        if source.path in self._sources:
+        if source.path in self._sources or source.path in self._source_aliases:
             raise SourceAlreadyExists(
                 f"Source '{source.path}' already exists!", source.path)
+        if source.alias and (
+                source.alias in self._source_aliases
+                or source.alias in self._sources):
+            raise AliasAlreadyExists(
+                f"Alias '{source.alias}' already exists!", source.alias)
 
         self._sources[source.path] = source
         if source.alias:
-            if source.alias in self._sources:
-                raise AliasAlreadyExists(
-                    f"Alias '{source.alias}' already exists!", source.alias)
-            self._sources[source.alias] = source
+            self._source_aliases[source.alias] = source.path
 
     def get_source(self, source_key: str) -> Source:
-        try:
-            return self._sources[source_key]
-        except KeyError:
+        source = self._sources.get(source_key)
+        if source is None:
+            path = self._source_aliases.get(source_key)
+            if path is not None:
+                source = self._sources.get(path)
+
+        if source is None:
             raise SourceNotFound(
                 f"Source '{source_key}' not found!", source_key)
+        return source
 
     def hash_all(self) -> None:
         for s in self.unique_sources():
@@ -150,6 +236,11 @@ class BackupHelper:
     def join(self) -> None:
         self._queue.join()
 
+    def close(self) -> None:
+        """Shuts down the work queue's worker threads, waits for running
+        work to finish"""
+        self._queue.close()
+
     def status(self, source_key: str) -> str:
         try:
             src = self.get_source(source_key)
@@ -182,6 +273,10 @@ def load_backup_state(
         fn, ext = os.path.splitext(path)
         bh.save_state(helpers.unique_filename(f"{fn}_crash{ext}"))
         raise
+    finally:
+        # passed in instances are owned by the caller, e.g. interactive mode
+        if instance is None:
+            bh.close()
 
 
 @ contextlib.contextmanager
@@ -1,15 +1,15 @@
 import os
 import threading
-import queue
 import dataclasses
 import logging
 import logging.config
 import time
 
+from concurrent.futures import ThreadPoolExecutor
 
 from typing import (
     TypeVar, Generic, Sequence, Optional, Callable, Tuple, Iterable,
-    List, Dict, cast
+    List, Dict, Set, cast
 )
 
 from backup_helper.exceptions import QueueItemsWillNeverBeReady
@@ -29,13 +29,27 @@ logger = logging.getLogger(__name__)
 def get_device_identifier(path: str) -> int:
     # st_dev
     # Identifier of the device on which this file resides.
-    curpath = path
-    while curpath:
+    try:
+        # common case: the path exists -> a single stat
+        return os.stat(path).st_dev
+    except FileNotFoundError:
+        pass
+
+    # resolve symlinks before walking up: a (dangling) symlink to a path that
+    # doesn't exist yet has to be followed to where it points to, stripping
+    # its name would yield the device of the dir containing the link;
+    # the components left missing after resolving can't be symlinks
+    curpath = os.path.realpath(path)
+    while True:
+        parent = os.path.dirname(curpath)
+        # reached the root/drive and that doesn't exist either
+        if parent == curpath:
+            break
+        curpath = parent
         try:
-            stat = os.stat(curpath)
-            return stat.st_dev
+            return os.stat(curpath).st_dev
         except FileNotFoundError:
-            curpath = os.path.dirname(os.path.realpath(curpath))
+            pass
 
     raise RuntimeError(f"Could not determine device of path {path}")
 
@@ -44,14 +58,21 @@ WorkType = TypeVar('WorkType')
 ResultType = TypeVar('ResultType')
 
 
+# NOTE: WrappedWork can't declare __slots__ by hand, since that conflicts
+# with its field defaults (and dataclass(slots=True) needs 3.10)
 @dataclasses.dataclass
 class WrappedWork(Generic[WorkType]):
     work: WorkType
     started: bool = False
+    # devices that were marked busy when the work was started, without
+    # duplicates (e.g. source and target on the same device)
+    involved_devices: Tuple[int, ...] = ()
 
 
 @dataclasses.dataclass
 class WrappedResult(Generic[WorkType, ResultType]):
+    __slots__ = ('work', 'result', 'error')
+
     work: WrappedWork[WorkType]
     result: Optional[ResultType]
     error: Optional[str]
@@ -70,24 +91,40 @@ class DiskWorkQueue(Generic[WorkType, ResultType]):
             worker_func: Callable[[WorkType], ResultType],
             work_ready_func: Callable[[WorkType], bool],
             report_progress_timestep_seconds=0,
-            work: Optional[List[WorkType]] = None):
+            work: Optional[List[WorkType]] = None,
+            max_workers: Optional[int] = None):
         """
         :params work: Optional list of work items to initialize the queue with
         :params report_progress_timestep_seconds:
             Time frame in seconds, where each work item in progress will
             be printed. Values <= 0 will result in no progress reports!
+        :params max_workers: Maximum number of work items running at the
+            same time, defaults to ThreadPoolExecutor's default. Items are
+            only started (and their devices reserved) once a worker is free.
         """
         self._path_getter = get_involved_paths
-        self._worker_func = self._wrap_worker(worker_func)
+        self._worker_func = worker_func
         self._work_ready_func = work_ready_func
-        # maps os.stat().st_dev to whether they're currently in use by this
+        # os.stat().st_dev of the devices that are currently in use by this
         # BackupHelper instance
-        self._busy_devices: Dict[int, bool] = {}
+        self._busy_devices: Set[int] = set()
         self._work: List[WrappedWork[WorkType]] = []
+        # items that haven't been started yet, in the order they were added,
+        # so a scheduling pass doesn't have to skip over all started ones
+        self._pending: List[WrappedWork[WorkType]] = []
         self._running: int = 0
-        # worker threads put the ResultType
-        self._thread_done: queue.Queue[
-            WrappedResult[WorkType, ResultType]] = queue.Queue()
+        # threads are reused for all work items and across calls to
+        # `start_ready_devices`, instead of spawning one per item
+        if max_workers is None:
+            # same default as ThreadPoolExecutor
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=type(self).__name__)
+        # worker threads append their WrappedResult and notify the
+        # (single) consumer, guarded by `_done_cond`
+        self._done_cond = threading.Condition()
+        self._done_list: List[WrappedResult[WorkType, ResultType]] = []
         self._finished: List[WrappedResult[WorkType, ResultType]] = []
         self._report_progress_timestep_seconds = report_progress_timestep_seconds
         self._last_report: float = 0
@@ -97,54 +134,69 @@ class DiskWorkQueue(Generic[WorkType, ResultType]):
 
     @staticmethod
     def _any_device_busy(
-            busy_devices: Dict[int, bool], device_ids: Iterable[int]) -> bool:
+            busy_devices: Set[int], device_ids: Iterable[int]) -> bool:
         """
         :param deviceIds: Iterable of deviceIds as returned by os.stat().st_dev
         :returns: Whether any device is currently busy (in the context of
                   this BackupHelper instance)
         """
-        for device_id in device_ids:
-            try:
-                busy = busy_devices[device_id]
-            except KeyError:
-                busy = False
-
-            if busy:
-                return True
-
-        return False
-
-    def _wrap_worker(
-        self,
-        worker_func: Callable[[WorkType], ResultType]
-    ) -> Callable[[WrappedWork[WorkType]], None]:
-        def wrapped(work: WrappedWork[WorkType]) -> None:
-            logger.debug('Starting work: %s', work.work)
-            try:
-                result = worker_func(work.work)
-            except Exception as e:
-                logger.warning('Failed work: %s: %s', work.work, str(e))
-                self._thread_done.put(WrappedResult(work, None, str(e)))
-            else:
-                logger.debug('Successfully completed work: %s', work.work)
-                self._thread_done.put(WrappedResult(work, result, None))
-
-        return wrapped
+        return not busy_devices.isdisjoint(device_ids)
 
-    def _get_involved_devices(self, work: WorkType) -> List[int]:
+    def _run_work(self, work: WrappedWork[WorkType]) -> None:
+        """Runs on the worker threads, hands the result back using `_put_done`"""
+        logger.debug('Starting work: %s', work.work)
+        try:
+            result = self._worker_func(work.work)
+        except Exception as e:
+            logger.warning('Failed work: %s: %s', work.work, str(e))
+            self._put_done(WrappedResult(work, None, str(e)))
+        else:
+            logger.debug('Successfully completed work: %s', work.work)
+            self._put_done(WrappedResult(work, result, None))
+
+    def _put_done(self, result: WrappedResult[WorkType, ResultType]) -> None:
+        with self._done_cond:
+            self._done_list.append(result)
+            self._done_cond.notify()
+
+    def _take_done(self) -> List[WrappedResult[WorkType, ResultType]]:
+        """Must be called with `_done_cond` held"""
+        done, self._done_list = self._done_list, []
+        return done
+
+    def _get_involved_devices(
+            self, work: WorkType,
+            device_cache: Optional[Dict[str, int]] = None) -> List[int]:
         """NOTE: the device ids should not be safed in case a parent dir
         of an involved path is a symlink and the actual target like
-        a mounted device does not exist yet"""
+        a mounted device does not exist yet
+        :param device_cache: Maps paths to their device ids, must only be
+                             shared during one scheduling pass
+        """
         paths = self._path_getter(work)
-        device_ids = [get_device_identifier(p) for p in paths]
+        if device_cache is None:
+            return [get_device_identifier(p) for p in paths]
+
+        device_ids = []
+        for p in paths:
+            try:
+                device_id = device_cache[p]
+            except KeyError:
+                device_id = get_device_identifier(p)
+                device_cache[p] = device_id
+            device_ids.append(device_id)
+
         return device_ids
 
-    def _can_start(self, work: WorkType) -> Tuple[bool, Optional[Iterable[int]]]:
+    def _can_start(
+            self, work: WorkType,
+            device_cache: Optional[Dict[str, int]] = None
+    ) -> Tuple[bool, Optional[Iterable[int]]]:
         if not self._work_ready_func(work):
             return False, None
 
         try:
-            device_ids = self._get_involved_devices(work)
+            device_ids = self._get_involved_devices(work, device_cache)
             if self._any_device_busy(self._busy_devices, device_ids):
                 return False, None
         except RuntimeError:
@@ -154,23 +206,26 @@ class DiskWorkQueue(Generic[WorkType, ResultType]):
 
     def add_work(self, work: Iterable[WorkType]):
         for w in work:
-            self._work.append(WrappedWork(w))
+            wrapped = WrappedWork(w)
+            self._work.append(wrapped)
+            self._pending.append(wrapped)
 
     def _work_done(self, result: WrappedResult[WorkType, ResultType]):
         self._finished.append(result)
-        # update devices
-        for dev in self._get_involved_devices(result.work.work):
-            self._busy_devices[dev] = False
+        # update devices, use the ones that were reserved when starting the
+        # work: re-resolving them might yield different ids, e.g. once
+        # a target path was created
+        self._busy_devices.difference_update(result.work.involved_devices)
 
         self._running -= 1
 
     def _update_finished_threads(self) -> None:
         """Does nothing when queue is empty"""
 
-        while not self._thread_done.empty():
-            wrapped_result = self._thread_done.get_nowait()
+        with self._done_cond:
+            done = self._take_done()
+        for wrapped_result in done:
             self._work_done(wrapped_result)
-            self._thread_done.task_done()
 
     def _report_progress(self) -> None:
         if self._report_progress_timestep_seconds <= 0:
@@ -188,46 +243,55 @@ class DiskWorkQueue(Generic[WorkType, ResultType]):
 
     def _wait_till_one_thread_finished_and_update(self):
         """
-        Blocks until at least one item is retrieved from the Queue.
-        Then updates it.
+        Blocks until at least one worker finished.
+        Then updates all finished ones.
         """
-        # NOTE: thread.join, q.get etc. are not interruptable by SIGINT
-        # need to use own implementation that uses the original with a timeout
-        # and a sleep (the latter is interruptable)
+        # NOTE: waiting without a timeout is not interruptable by SIGINT
+        # (at least on Windows), so wake up periodically, which is also
+        # needed for the progress reports; a finished worker still wakes
+        # us up immediately
         while True:
             self._report_progress()
-            try:
-                wrapped_result = self._thread_done.get(timeout=0.1)
-            except queue.Empty:
-                time.sleep(0.2)
-            else:
-                break
-        self._work_done(wrapped_result)
-        self._thread_done.task_done()
+            with self._done_cond:
+                if self._done_cond.wait_for(lambda: self._done_list, timeout=0.2):
+                    done = self._take_done()
+                    break
+        for wrapped_result in done:
+            self._work_done(wrapped_result)
 
     def start_ready_devices(self):
         """
-        Starts a Thread on all work items if all involved devices are
+        Starts all work items on the thread pool if all involved devices are
         currently not in use by this DiskWorkQueue
         """
         # first update the busy devices if there are finished threads
         self._update_finished_threads()
 
         started = False
-        for work in self._work:
-            if work.started:
+        # most work items share their source/target paths, so only stat
+        # each path once per pass (but not across passes, see
+        # `_get_involved_devices`)
+        device_cache: Dict[str, int] = {}
+        still_pending: List[WrappedWork[WorkType]] = []
+        for work in self._pending:
+            # don't let items wait in the executor's backlog, they would
+            # keep their devices reserved without running
+            if self._running >= self._max_workers:
+                still_pending.append(work)
                 continue
 
-            can_start, devices = self._can_start(work.work)
-            if can_start:
+            can_start, devices = self._can_start(work.work, device_cache)
+            if not can_start:
+                still_pending.append(work)
+            else:
                 started = True
-                for dev in devices:
-                    self._busy_devices[dev] = True
+                work.involved_devices = tuple(dict.fromkeys(devices))
+                self._busy_devices.update(work.involved_devices)
 
-                t = threading.Thread(target=self._worker_func, args=[work])
-                t.start()
+                self._executor.submit(self._run_work, work)
                 self._running += 1
                 work.started = True
+        self._pending = still_pending
 
         # we might've items that will never finish since they're
         # _work_ready_func will never return True
@@ -237,7 +301,7 @@ class DiskWorkQueue(Generic[WorkType, ResultType]):
             raise QueueItemsWillNeverBeReady(
                 "The queue items left will never be ready, since no more jobs "
                 "are running and no jobs could be started!\n",
-                [w for w in self._work if w.started is False])
+                list(self._pending))
 
     def get_finished_items(self) -> Tuple[List[ResultType], List[Tuple[WorkType, str]]]:
         self._update_finished_threads()
@@ -266,6 +330,17 @@ class DiskWorkQueue(Generic[WorkType, ResultType]):
         while self.workers_running():
             self._wait_till_one_thread_finished_and_update()
 
+    def close(self) -> None:
+        """Shuts down the worker threads, waits for running work items
+        to finish. No more work can be started afterwards"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'DiskWorkQueue[WorkType, ResultType]':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
     # TODO: run all transfers on a device before any verify
     def start_and_join_all(self) -> Tuple[List[ResultType], List[Tuple[WorkType, str]]]:
         """
@@ -43,6 +43,12 @@ class HashError(BackupHelperException):
         super().__init__(message)
 
 
+class UnsupportedStateVersion(BackupHelperException):
+    def __init__(self, message: str, version: object):
+        super().__init__(message)
+        self.version = version
+
+
 T = TypeVar('T')
 
 
@@ -3,35 +3,66 @@ import dataclasses
 import logging
 import logging.handlers
 import threading
+import functools
 import contextlib
+import hashlib
 
-from typing import Callable, TypeVar, Optional, Iterator, Iterable, Set
+from typing import (
+    Callable, TypeVar, Optional, Iterator, Iterable, Set, Tuple, Dict
+)
+
+
+BANNED_FILENAME_CHARS = ('/', '<', '>', ':', '"', '\\', '|', '?', '*')
+
+
+@functools.lru_cache(maxsize=4)
+def _sanitize_table(replacement_char: str) -> Dict[int, str]:
+    return str.maketrans(
+        {c: replacement_char for c in BANNED_FILENAME_CHARS})
 
 
 def sanitize_filename(s: str, replacement_char='_') -> str:
-    BANNED_CHARS = ('/', '<', '>', ':', '"', '\\', '|', '?', '*')
-    return "".join(c if c not in BANNED_CHARS else replacement_char
-                   for c in s.strip())
+    return s.strip().translate(_sanitize_table(replacement_char))
+
+
+# shake_128/shake_256 are excluded, since their hexdigest() needs a length
+HASH_ALGORITHMS = frozenset(
+    a for a in hashlib.algorithms_available if 'shake' not in a)
+
+
+def validate_hash_algorithm(name: str) -> str:
+    """
+    :raises ValueError: If `name` is not a fixed-length algorithm supported
+                        by hashlib
+    """
+    if name not in HASH_ALGORITHMS:
+        raise ValueError(
+            f"unsupported hash algorithm '{name}', choose one of: "
+            f"{', '.join(sorted(HASH_ALGORITHMS))}")
+    return name
+
+
+TRUE_STRINGS = frozenset(('y', 'yes', 'true', '1'))
 
 
 def bool_from_str(s: str) -> bool:
-    if s.lower() in ('y', 'yes', 'true', '1'):
-        return True
-    return False
+    return s.lower() in TRUE_STRINGS
 
 
 T = TypeVar('T')
 
 
+@functools.lru_cache(maxsize=None)
+def _dataclass_fields(cls: type) -> Tuple[dataclasses.Field, ...]:
+    return dataclasses.fields(cls)
+
+
 def format_dataclass_fields(
         dc: T,
         filter: Callable[[dataclasses.Field], bool]) -> str:
-    builder = []
-    for field in dataclasses.fields(dc):
-        if filter(field):
-            builder.append(f"{field.name} = {getattr(dc, field.name)}")
-
-    return "\n".join(builder)
+    return "\n".join(
+        f"{field.name} = {getattr(dc, field.name)}"
+        for field in _dataclass_fields(type(dc)) if filter(field))
 
 
 def unique_filename(path: str) -> str:
@@ -39,11 +70,28 @@ def unique_filename(path: str) -> str:
         return path
     base, filename = os.path.split(path)
     filename, ext = os.path.splitext(filename)
-    inc = 0
-    while os.path.exists(os.path.join(base, f"{filename}_{inc}{ext}")):
-        inc += 1
 
-    return os.path.join(base, f"{filename}_{inc}{ext}")
+    def with_inc(inc: int) -> str:
+        return os.path.join(base, f"{filename}_{inc}{ext}")
+
+    if not os.path.exists(with_inc(0)):
+        return with_inc(0)
+
+    # suffixes are handed out in order, so probe exponentially for a free
+    # one and then binary search for the first free one in between
+    # -> O(log n) instead of O(n) exists calls
+    used, free = 0, 1
+    while os.path.exists(with_inc(free)):
+        used = free
+        free *= 2
+    while free - used > 1:
+        mid = (used + free) // 2
+        if os.path.exists(with_inc(mid)):
+            used = mid
+        else:
+            free = mid
+
+    return with_inc(free)
 
 
 class ThreadLogFilter(logging.Filter):
@@ -55,6 +103,8 @@ class ThreadLogFilter(logging.Filter):
     def __init__(self, threadid: Optional[int] = None):
         if threadid is None:
             self._threadid = threading.get_ident()
+        else:
+            self._threadid = threadid
 
     def filter(self, record: logging.LogRecord) -> bool:
         if record.thread != self._threadid:
@@ -84,8 +134,14 @@ def setup_thread_log_file(logger: logging.Logger, log_path: str) -> logging.Hand
 def setup_thread_log_file_autoremove(
         logger: logging.Logger, log_path: str) -> Iterator[logging.Handler]:
     handler = setup_thread_log_file(logger, log_path)
-    yield handler
-    logger.removeHandler(handler)
+    # NOTE: worker threads are re-used, so the handler also needs to be
+    # removed if an exception occurs, otherwise it'd pick up the logs of
+    # the next work item on the same thread
+    try:
+        yield handler
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
 
 
 def unique_iterator(to_iter: Iterable[T], key: str = 'path') -> Iterator[T]:
@@ -184,11 +184,11 @@ class BackupHelperInteractive(cmd.Cmd):
         self, text: str, line: str, begidx: int, endidx: int
     ) -> list[str]:
         if not text:
-            return list(self._instance._sources.keys())
+            return list(self._instance.source_keys())
 
         full_arg, chars_to_remove_from_result = _readline_get_full_arg(
             text, line, begidx, endidx)
 
         return [key[chars_to_remove_from_result - 1:]
-                for key in self._instance._sources.keys()
+                for key in self._instance.source_keys()
                 if key.startswith(full_arg)]
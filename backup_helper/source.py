@@ -6,9 +6,10 @@ import logging
 import shutil
 import threading
 import fnmatch
+import re
 
 from typing import (
-    Optional, Dict, Union, List, Any, Iterator, Set, overload, Tuple, Iterable,
+    Optional, Dict, Union, List, Any, Iterator, overload, Tuple, Iterable,
     Callable
 )
 
@@ -44,13 +45,18 @@ class Source:
                  hash_file: Optional[str], hash_log_file: Optional[str],
                  targets: Dict[str, Target], force_single_hash: bool = False,
                  blocklist: Optional[List[str]] = None):
+        # NOTE: abspath already normalizes the path
         # TODO realpath, target too?
-        self.path = os.path.normpath(os.path.abspath(path))
+        self.path = os.path.abspath(path)
         self.alias = alias
         self.hash_algorithm = hash_algorithm
         self.hash_file = hash_file
         self.hash_log_file = hash_log_file
+        # keyed by path only, aliases are resolved through `_target_aliases`
         self.targets = targets
+        # maps alias -> path
+        self._target_aliases: Dict[str, str] = {
+            t.alias: t.path for t in targets.values() if t.alias}
         self.force_single_hash = force_single_hash
         if blocklist is None:
             self.blocklist = []
@@ -58,33 +64,25 @@ class Source:
             self.blocklist = blocklist
 
     def to_json(self) -> Dict[Any, Any]:
-        result = {"version": 1, "type": type(self).__name__}
-        for k, v in self.__dict__.items():
-            if k in result:
-                raise RuntimeError("Duplicate field key")
-            elif k == "targets":
-                continue
-            result[k] = v
-
-        targets: List[Dict[str, Any]] = []
-        # targets contain both path as well as alias as keys, so we have to
-        # deduplicate them
-        seen: Set[str] = set()
-        for target in self.targets.values():
-            if target.path not in seen:
-                targets.append(target.to_json())
-                seen.add(target.path)
-
-        result["targets"] = targets
-
-        return result
+        # no "version"/"type" header, the BackupHelper one covers the
+        # whole state file
+        return {
+            "path": self.path,
+            "alias": self.alias,
+            "hash_algorithm": self.hash_algorithm,
+            "hash_file": self.hash_file,
+            "hash_log_file": self.hash_log_file,
+            "force_single_hash": self.force_single_hash,
+            "blocklist": self.blocklist,
+            "targets": [target.to_json() for target in self.targets.values()],
+        }
 
     @ staticmethod
     def from_json(json_object: Dict[Any, Any]) -> 'Source':
         targets: Dict[str, Target] = {}
-        for target in json_object["targets"]:
+        for target_json in json_object["targets"]:
+            target = Target.from_json(target_json)
             targets[target.path] = target
-            targets[target.alias] = target
 
         return Source(
             json_object["path"],
@@ -98,32 +96,38 @@ class Source:
         )
 
     def unique_targets(self) -> Iterator[Target]:
-        # targets contain both path as well as alias as keys, so we have to
-        # deduplicate them
-        yield from helpers.unique_iterator(self.targets.values())
+        yield from self.targets.values()
 
     def add_target(self, target: Target):
-        if target.path in self.targets:
+        if target.path in self.targets or target.path in self._target_aliases:
             raise TargetAlreadyExists(
                 f"Target '{target.path}' already exists on source '{
                     self.path}'!",
                 self.path, target.path)
+        if target.alias and (
+                target.alias in self._target_aliases
+                or target.alias in self.targets):
+            raise AliasAlreadyExists(
+                f"Alias '{target.alias}' already exists on source '{
+                    self.path}'!",
+                target.alias)
+
         self.targets[target.path] = target
         if target.alias:
-            if target.alias in self.targets:
-                raise AliasAlreadyExists(
-                    f"Alias '{target.alias}' already exists on source '{
-                        self.path}'!",
-                    target.alias)
-            self.targets[target.alias] = target
+            self._target_aliases[target.alias] = target.path
 
     def get_target(self, target_key: str) -> Target:
-        try:
-            return self.targets[target_key]
-        except KeyError:
+        target = self.targets.get(target_key)
+        if target is None:
+            path = self._target_aliases.get(target_key)
+            if path is not None:
+                target = self.targets.get(path)
+
+        if target is None:
             raise TargetNotFound(
                 f"Target '{target_key}' not found on source '{self.path}'!",
                 self.path, target_key)
+        return target
 
     def _generate_hash_file_path(self) -> str:
         hashed_directory_name = os.path.basename(self.path)
@@ -186,26 +190,30 @@ class Source:
         if not self.blocklist:
             return None
 
+        # combine all patterns into one regex that is compiled once, instead
+        # of matching every name against every pattern;
+        # same semantics as fnmatch.fnmatch, which normalizes the case of
+        # the name and pattern
+        blocklist_re = re.compile("|".join(
+            fnmatch.translate(os.path.normcase(pattern))
+            for pattern in self.blocklist))
+
         def _ignore(path: str, names: List[str]) -> Iterable[str]:
             # path is absolute, create relpath from self.path so we can
             # compare it against the full relative path and not just the name
             # (fn generated by shutil.ignore_patterns will just match against
             #  the name)
             relpath_dir = os.path.relpath(path, start=self.path)
-            ignored = []
-            for name in names:
-                # so that relpath doesn't start with ./ or .\
-                relpath = os.path.join(
-                    '' if relpath_dir == '.' else relpath_dir, name)
-                print(relpath)
-                for pattern in self.blocklist:
-                    if fnmatch.fnmatch(relpath, pattern):
-                        ignored.append(name)
-                        # already ignored
-                        break
-
-            logger.debug("Source '%s' ignoring file(s) in '%s':\n%s",
-                         self.path, relpath, "\n".join(n for n in ignored))
+            # so that relpath doesn't start with ./ or .\
+            prefix = '' if relpath_dir == '.' else relpath_dir
+            ignored = [
+                name for name in names
+                if blocklist_re.match(
+                    os.path.normcase(os.path.join(prefix, name)))]
+
+            if ignored and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Source '%s' ignoring file(s) in '%s':\n%s",
+                             self.path, path, "\n".join(ignored))
             return ignored
 
         return _ignore
@@ -272,6 +280,10 @@ class Source:
 
     def transfer_all(self, queue: Optional[work.WorkQueue] = None) -> Tuple[
             List[work.WorkType], List[Tuple[work.WorkResult, str]]]:
+        if queue is None:
+            # one-shot queue, make sure its worker threads are shut down
+            with work.setup_work_queue([]) as own_queue:
+                return self.transfer_queue_all(own_queue).start_and_join_all()
         queue = self.transfer_queue_all(queue)
         return queue.start_and_join_all()
 
@@ -291,6 +303,11 @@ class Source:
 
     def verify_target_all(self, queue: Optional[work.WorkQueue] = None) -> Tuple[
             List[work.WorkType], List[Tuple[work.WorkResult, str]]]:
+        if queue is None:
+            # one-shot queue, make sure its worker threads are shut down
+            with work.setup_work_queue([]) as own_queue:
+                return self.verify_target_queue_all(
+                    own_queue).start_and_join_all()
         queue = self.verify_target_queue_all(queue)
         return queue.start_and_join_all()
 
@@ -306,7 +323,7 @@ class Source:
         elif field_name == "alias":
             self.alias = value_str
         elif field_name == "hash_algorithm":
-            self.hash_algorithm = value_str
+            self.hash_algorithm = helpers.validate_hash_algorithm(value_str)
         elif field_name == "hash_file":
             self.hash_file = value_str
         elif field_name == "hash_log_file":
@@ -15,8 +15,11 @@ from backup_helper import helpers
 logger = logging.getLogger(__name__)
 
 
-@ dataclasses.dataclass
+# NOTE: slots are declared by hand, since dataclass(slots=True) needs 3.10
+@ dataclasses.dataclass(frozen=True)
 class VerifiedInfo:
+    __slots__ = ('checked', 'errors', 'missing', 'crc_errors', 'log_file')
+
     checked: int
     errors: int
     missing: int
@@ -26,6 +29,8 @@ class VerifiedInfo:
 
 @dataclasses.dataclass
 class Target:
+    __slots__ = ('path', 'alias', 'transfered', 'verify', 'verified')
+
     path: str
     alias: Optional[str]
     transfered: bool
@@ -34,24 +39,28 @@ class Target:
 
     def __init__(self, path: str, alias: Optional[str], transfered: bool,
                  verify: bool, verified: Optional[VerifiedInfo]):
-        self.path = os.path.normpath(os.path.abspath(path))
+        self.path = os.path.abspath(path)
         self.alias = alias
         self.transfered = transfered
         self.verify = verify
         self.verified = verified
 
     def to_json(self) -> Dict[Any, Any]:
-        result = {"version": 1, "type": type(self).__name__}
-        for k, v in self.__dict__.items():
-            if k in result:
-                raise RuntimeError("Duplicate field key")
-            elif k == "verified":
-                continue
-            result[k] = v
-
-        result["verified"] = self.verified.__dict__ if self.verified else None
-
-        return result
+        # no "version"/"type" header, the BackupHelper one covers the
+        # whole state file
+        return {
+            "path": self.path,
+            "alias": self.alias,
+            "transfered": self.transfered,
+            "verify": self.verify,
+            "verified": {
+                "checked": self.verified.checked,
+                "errors": self.verified.errors,
+                "missing": self.verified.missing,
+                "crc_errors": self.verified.crc_errors,
+                "log_file": self.verified.log_file,
+            } if self.verified else None,
+        }
 
     @ staticmethod
     def from_json(json_object: Dict[Any, Any]) -> 'Target':
@@ -1,9 +1,11 @@
 import pytest
+import gzip
 import json
 import os
 
 from backup_helper import backup_helper
-from backup_helper.target import VerifiedInfo
+from backup_helper.target import Target, VerifiedInfo
+from backup_helper.exceptions import UnsupportedStateVersion
 
 BH_WITH_ONE_SOURCE_JSON = """{
    "version":1,
@@ -44,26 +46,40 @@ class MockFile:
         self.written = contents
         return len(contents)
 
+    def flush(self):
+        pass
+
+    def fileno(self):
+        return -1
+
 
 @pytest.fixture
 def read_empty_backup_helper(monkeypatch):
     def mock_open(filename, mode='r', encoding=''):
         return MockFile(
-            read_data=json.dumps(backup_helper.BackupHelper([]).to_json()))
+            read_data=json.dumps(
+                backup_helper.BackupHelper([]).to_json()).encode('utf-8'))
     monkeypatch.setattr('builtins.open', mock_open)
 
 
 @pytest.fixture
 def read_backup_helper_state_return_written(monkeypatch):
-    written = {'contents': MockFile(), 'filename': None}
+    written = {'contents': MockFile(), 'filename': None, 'tmp_filename': None}
 
     def mock_open(filename, mode='r', encoding=''):
         if 'w' in mode:
-            written['filename'] = filename
+            written['tmp_filename'] = filename
             return written['contents']
         else:
-            return MockFile()
+            raise FileNotFoundError(filename)
+
+    def mock_replace(src, dst):
+        assert src == written['tmp_filename']
+        written['filename'] = dst
+
     monkeypatch.setattr('builtins.open', mock_open)
+    monkeypatch.setattr('backup_helper.backup_helper.os.fsync', lambda fd: None)
+    monkeypatch.setattr('backup_helper.backup_helper.os.replace', mock_replace)
     return written
 
 
@@ -131,6 +147,70 @@ def test_load_backup_state_save_always_save_normal(read_backup_helper_state_retu
         []).to_json()
 
 
+def test_save_state_replaces_tmp_file(read_backup_helper_state_return_written):
+    written = read_backup_helper_state_return_written
+    backup_helper.BackupHelper([]).save_state("test")
+
+    assert written['tmp_filename'] == 'test.tmp'
+    assert written['filename'] == 'test'
+
+
+def test_save_state_failed_write_keeps_original(tmp_path, monkeypatch):
+    path = tmp_path / 'backup_status.json'
+    path.write_bytes(b'original')
+
+    def fsync(fd):
+        raise OSError('disk full')
+
+    monkeypatch.setattr('backup_helper.backup_helper.os.fsync', fsync)
+    with pytest.raises(OSError, match='disk full'):
+        backup_helper.BackupHelper([]).save_state(str(path))
+
+    assert path.read_bytes() == b'original'
+    assert os.listdir(tmp_path) == ['backup_status.json']
+
+
+def test_save_state_keeps_symlink_and_mode(tmp_path):
+    real = tmp_path / 'real.json'
+    real.write_bytes(b'original')
+    os.chmod(real, 0o600)
+    link = tmp_path / 'backup_status.json'
+    try:
+        os.symlink(real, link)
+    except OSError:
+        pytest.skip('symlinks not supported')
+
+    bh = backup_helper.BackupHelper([])
+    bh.save_state(str(link))
+
+    assert os.path.islink(link)
+    assert json.loads(real.read_bytes()) == bh.to_json()
+    if os.name == 'posix':
+        assert os.stat(real).st_mode & 0o777 == 0o600
+    assert sorted(os.listdir(tmp_path)) == ['backup_status.json', 'real.json']
+
+
+def test_save_state_skips_unchanged(read_backup_helper_state_return_written):
+    written = read_backup_helper_state_return_written
+    bh = backup_helper.BackupHelper([])
+    bh.save_state("test")
+    assert written['filename'] == 'test'
+
+    written['filename'] = None
+    bh.save_state("test")
+    assert written['filename'] is None
+
+    # different path is always written
+    bh.save_state("test2")
+    assert written['filename'] == 'test2'
+
+    written['filename'] = None
+    bh.add_source(
+        backup_helper.Source('test/1', 'test1', 'md5', None, None, {}))
+    bh.save_state("test2")
+    assert written['filename'] == 'test2'
+
+
 def test_load_backup_state_save_always_save_crash(read_backup_helper_state_return_written):
     written = read_backup_helper_state_return_written
     # saves as _crash
@@ -145,9 +225,24 @@ def test_load_backup_state_save_always_save_crash(read_backup_helper_state_retur
         []).to_json()
 
 
-def test_load_state_creates_sets_workdir(monkeypatch, read_empty_backup_helper):
-    monkeypatch.setattr('os.path.exists', lambda *args: True)
+def test_load_backup_state_closes_own_instance(
+        monkeypatch, read_backup_helper_state_return_written):
+    closed = []
+    monkeypatch.setattr(
+        backup_helper.BackupHelper, 'close', lambda self: closed.append(self))
+
+    with backup_helper.load_backup_state('test.json') as bh:
+        pass
+    assert closed == [bh]
+
+    # passed in instances are owned by the caller
+    instance = backup_helper.BackupHelper([])
+    with backup_helper.load_backup_state('test.json', instance):
+        pass
+    assert closed == [bh]
+
 
+def test_load_state_creates_sets_workdir(read_empty_backup_helper):
     bh = backup_helper.BackupHelper.load_state(
         os.path.join(os.path.abspath('.'),
                      'workdir',
@@ -155,9 +250,75 @@ def test_load_state_creates_sets_workdir(monkeypatch, read_empty_backup_helper):
     assert bh._working_dir == os.path.join(os.path.abspath('.'), 'workdir')
 
 
+def test_save_state_gzip(read_backup_helper_state_return_written):
+    written = read_backup_helper_state_return_written
+    backup_helper.BackupHelper([]).save_state("test.json.gz")
+
+    assert written['filename'] == 'test.json.gz'
+    assert json.loads(gzip.decompress(written['contents'].written)) == \
+        backup_helper.BackupHelper([]).to_json()
+
+
+@pytest.mark.parametrize('use_orjson', [False, True])
+def test_save_state_non_utf8_path_roundtrip(
+        use_orjson, monkeypatch, read_backup_helper_state_return_written):
+    if not use_orjson:
+        monkeypatch.setattr(backup_helper, 'orjson', None)
+    elif backup_helper.orjson is None:
+        pytest.skip('orjson not installed')
+    written = read_backup_helper_state_return_written
+    # undecodable bytes end up as lone surrogates
+    path = os.path.abspath(os.fsdecode(b'caf\xe9'))
+    backup_helper.BackupHelper([
+        backup_helper.Source(path, None, 'md5', None, None, {})
+    ]).save_state('test.json')
+
+    monkeypatch.setattr(
+        'builtins.open', lambda *args, **kwargs: MockFile(
+            read_data=written['contents'].written))
+    bh = backup_helper.BackupHelper.load_state('test.json')
+    assert [s.path for s in bh.unique_sources()] == [path]
+
+
+def test_state_stdlib_fallback_roundtrip(
+        monkeypatch, setup_backup_helper_2sources_2targets_1verified):
+    bh = setup_backup_helper_2sources_2targets_1verified['bh']
+    monkeypatch.setattr(backup_helper, 'orjson', None)
+
+    contents = backup_helper._dumps_state(bh.to_json())
+    assert isinstance(contents, bytes)
+    assert backup_helper.BackupHelper.from_json(contents).to_json() == \
+        bh.to_json()
+
+
+def test_load_state_gzip(monkeypatch):
+    monkeypatch.setattr(
+        'builtins.open', lambda *args, **kwargs: MockFile(
+            read_data=gzip.compress(BH_WITH_ONE_SOURCE_JSON.encode('utf-8'))))
+
+    bh = backup_helper.BackupHelper.load_state('test.json')
+    assert [s.alias for s in bh.unique_sources()] == ['bg2']
+
+
+def test_load_state_empty_file(monkeypatch):
+    monkeypatch.setattr(
+        'builtins.open', lambda *args, **kwargs: MockFile(read_data=b''))
+
+    bh = backup_helper.BackupHelper.load_state(os.path.join('workdir', 'test.json'))
+    assert list(bh.unique_sources()) == []
+    assert bh._working_dir == 'workdir'
+
+
+def test_load_state_missing_file_sets_workdir(tmp_path):
+    path = tmp_path / 'workdir' / 'test.json'
+    bh = backup_helper.BackupHelper.load_state(str(path))
+    assert list(bh.unique_sources()) == []
+    assert bh._working_dir == str(tmp_path / 'workdir')
+
+
 def test_backup_helper_to_json_init_state():
     bh = backup_helper.BackupHelper([]).to_json()
-    assert bh == {'version': 1, 'type': 'BackupHelper', 'sources': []}
+    assert bh == {'version': 2, 'type': 'BackupHelper', 'sources': []}
 
 
 def test_backup_helper_only_save_unique_sources():
@@ -178,9 +339,9 @@ def setup_backup_helper_2sources_2targets_1verified():
     bh = backup_helper.BackupHelper([])
     src1 = backup_helper.Source(
         'test/1', 'test1', 'md5', 'hashfile1', 'hashlog1', {})
-    src1_target1 = backup_helper.Target(
+    src1_target1 = Target(
         'test/target/1', 'target1', False, False, None)
-    src1_target2 = backup_helper.Target(
+    src1_target2 = Target(
         'test/target/2', 'target2', False, True,
         VerifiedInfo(4, 2, 2, 0, 'verifylog2'))
     src1.add_target(src1_target1)
@@ -206,10 +367,9 @@ def test_backup_helper_to_json(setup_backup_helper_2sources_2targets_1verified):
 
     d = bh.to_json()
     assert d == {
-        'version': 1, 'type': 'BackupHelper',
+        'version': 2, 'type': 'BackupHelper',
         'sources': [
             {
-                'version': 1, 'type': 'Source',
                 'path': src1.path, 'alias': src1.alias,
                 'hash_algorithm': src1.hash_algorithm,
                 'hash_file': src1.hash_file,
@@ -218,7 +378,6 @@ def test_backup_helper_to_json(setup_backup_helper_2sources_2targets_1verified):
                 'blocklist': [],
                 'targets': [
                     {
-                        'version': 1, 'type': 'Target',
                         'path': src1_target1.path,
                         'alias': src1_target1.alias,
                         'transfered': src1_target1.transfered,
@@ -226,7 +385,6 @@ def test_backup_helper_to_json(setup_backup_helper_2sources_2targets_1verified):
                         'verified': None,
                     },
                     {
-                        'version': 1, 'type': 'Target',
                         'path': src1_target2.path,
                         'alias': src1_target2.alias,
                         'transfered': src1_target2.transfered,
@@ -242,7 +400,6 @@ def test_backup_helper_to_json(setup_backup_helper_2sources_2targets_1verified):
                 ],
             },
             {
-                'version': 1, 'type': 'Source',
                 'path': src2.path, 'alias': src2.alias,
                 'hash_algorithm': src2.hash_algorithm,
                 'hash_file': src2.hash_file,
@@ -334,12 +491,13 @@ def test_backup_helper_from_json(setup_backup_helper_2sources_2targets_1verified
 
     loaded = backup_helper.BackupHelper.from_json(json_str)
 
-    # 2 sources but 2path 2alias
-    assert len(bh._sources) == 4
+    # 2 sources only keyed by path, aliases are stored separately
+    assert len(bh._sources) == 2
+    assert len(bh._source_aliases) == 2
 
     loaded_src1 = loaded._sources[src1.path]
     # accessible using alias
-    assert loaded_src1 is loaded._sources[src1.alias]
+    assert loaded_src1 is loaded.get_source(src1.alias)
     assert loaded_src1.path == src1.path
     assert loaded_src1.alias == src1.alias
 
@@ -351,7 +509,7 @@ def test_backup_helper_from_json(setup_backup_helper_2sources_2targets_1verified
 
     loaded_src2 = loaded._sources[src2.path]
     # accessible using alias
-    assert loaded_src2 is loaded._sources[src2.alias]
+    assert loaded_src2 is loaded.get_source(src2.alias)
     assert loaded_src2.path == src2.path
     assert loaded_src2.alias == src2.alias
 
@@ -362,10 +520,10 @@ def test_backup_helper_from_json(setup_backup_helper_2sources_2targets_1verified
     assert loaded_src2.blocklist == src2.blocklist
 
     # targets
-    # 4targets -> 2path 2alias
-    assert len(loaded_src1.targets) == 4
+    # only keyed by path
+    assert len(loaded_src1.targets) == 2
     loaded_src1_target1 = loaded_src1.targets[src1_target1.path]
-    assert loaded_src1_target1 is loaded_src1.targets[src1_target1.alias]
+    assert loaded_src1_target1 is loaded_src1.get_target(src1_target1.alias)
     assert loaded_src1_target1.path == src1_target1.path
     assert loaded_src1_target1.alias == src1_target1.alias
     assert loaded_src1_target1.transfered is src1_target1.transfered
@@ -373,7 +531,7 @@ def test_backup_helper_from_json(setup_backup_helper_2sources_2targets_1verified
     assert loaded_src1_target1.verified is src1_target1.verified
 
     loaded_src1_target2 = loaded_src1.targets[src1_target2.path]
-    assert loaded_src1_target2 is loaded_src1.targets[src1_target2.alias]
+    assert loaded_src1_target2 is loaded_src1.get_target(src1_target2.alias)
     assert loaded_src1_target2.path == src1_target2.path
     assert loaded_src1_target2.alias == src1_target2.alias
     assert loaded_src1_target2.transfered is src1_target2.transfered
@@ -381,6 +539,15 @@ def test_backup_helper_from_json(setup_backup_helper_2sources_2targets_1verified
     assert loaded_src1_target2.verified == src1_target2.verified
 
 
+@pytest.mark.parametrize('state', [
+    '{"version":3,"type":"BackupHelper","sources":[]}',
+    '{"type":"BackupHelper","sources":[]}',
+])
+def test_backup_helper_from_json_unsupported_version(state):
+    with pytest.raises(UnsupportedStateVersion, match='Unsupported.*version'):
+        backup_helper.BackupHelper.from_json(state)
+
+
 def test_unique_sources(setup_backup_helper_2sources_2targets_1verified):
     setup = setup_backup_helper_2sources_2targets_1verified
 
@@ -397,9 +564,10 @@ def test_backup_helper_add_source():
         'test/1', 'test1', 'md5', None, None, {}, False, None)
     bh.add_source(src)
 
-    # added with path AND alias
+    # added with path, alias maps to the path
     assert bh._sources[os.path.join(os.path.abspath('.'), 'test', '1')] is src
-    assert bh._sources['test1'] is src
+    assert bh._source_aliases['test1'] == src.path
+    assert bh.get_source('test1') is src
 
 
 def test_backup_helper_add_source_already_present():
@@ -437,6 +605,17 @@ def test_backup_helper_get_source():
     assert bh.get_source('test1') is src
 
 
+def test_backup_helper_add_source_alias_error_does_not_add():
+    bh = backup_helper.BackupHelper([])
+    bh.add_source(backup_helper.Source(
+        'test/1', 'test1', 'md5', None, None, {}, False, None))
+
+    with pytest.raises(backup_helper.AliasAlreadyExists):
+        bh.add_source(backup_helper.Source(
+            'test/2', 'test1', 'md5', None, None, {}, False, None))
+    assert list(bh.source_keys()) == [os.path.abspath('test/1'), 'test1']
+
+
 def test_backup_helper_get_source_not_found():
     bh = backup_helper.BackupHelper([])
     src = backup_helper.Source(
@@ -523,3 +702,8 @@ def test_backup_helper_transfer_all_exception_does_not_abort(
         assert all(
             not t.transfered if t.path == err_target_path else t.transfered
             for t in src.unique_targets())
+
+
+def test_target_reexported():
+    from backup_helper.backup_helper import Target as ReexportedTarget
+    assert ReexportedTarget is Target
@@ -0,0 +1,20 @@
+import pytest
+
+from backup_helper.cli import build_parser
+
+
+def test_stage_hash_algorithm_accepted():
+    args = build_parser().parse_args(
+        ['stage', '/home/test', '--hash-algorithm', 'blake2b'])
+    assert args.hash_algorithm == 'blake2b'
+
+
+@pytest.mark.parametrize('algorithm', ['nope', 'shake_128', 'shake_256'])
+def test_stage_hash_algorithm_unsupported_rejected(algorithm, capsys):
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(
+            ['stage', '/home/test', '--hash-algorithm', algorithm])
+
+    captured = capsys.readouterr()
+    assert "--hash-algorithm" in captured.err
+    assert algorithm in captured.err
@@ -1,5 +1,7 @@
 import pytest
 import os
+import threading
+import time
 
 from unittest.mock import patch
 
@@ -9,18 +11,18 @@ from backup_helper import disk_work_queue as dwq
 from backup_helper.exceptions import QueueItemsWillNeverBeReady
 
 
-@pytest.mark.parametrize('test_devices,busy_map,expected', [
-    ([13], {}, False),
-    ([13], {13: False}, False),
-    ([13], {13: True}, True),
-    ([13, 3, 9], {}, False),
-    ([13, 3, 9], {13: False, 3: False}, False),
-    ([13, 3, 9], {13: True}, True),
-    ([13, 3, 9], {13: False, 3: False, 9: True}, True),
+@pytest.mark.parametrize('test_devices,busy_set,expected', [
+    ([13], set(), False),
+    ([13], {4}, False),
+    ([13], {13}, True),
+    ([13, 3, 9], set(), False),
+    ([13, 3, 9], {4, 5}, False),
+    ([13, 3, 9], {13}, True),
+    ([13, 3, 9], {4, 5, 9}, True),
 ])
-def test_any_device_busy(test_devices, busy_map, expected):
+def test_any_device_busy(test_devices, busy_set, expected):
     assert dwq.DiskWorkQueue._any_device_busy(
-        busy_map, test_devices) is expected
+        busy_set, test_devices) is expected
 
 
 def test_add_work(monkeypatch) -> None:
@@ -199,7 +201,7 @@ def test_get_finished_items():
     q = dwq.DiskWorkQueue(lambda x: x, lambda x: x, lambda x: True)
     # to make sure get_finished_items also includes finished threads that
     # were not yet put into q._finished
-    q._thread_done.put(
+    q._put_done(
         dwq.WrappedResult(dwq.WrappedWork('work2'), 'work2', None),
     )
     q._finished.extend([
@@ -229,7 +231,7 @@ def test_join(setup_disk_work_queue_start_ready):
     q, started, _ = setup_disk_work_queue_start_ready
     q.start_ready_devices()
     q.join()
-    assert all(not x for x in q._busy_devices.values())
+    assert not q._busy_devices
     assert q._running == 0
     assert q.get_finished_items() == (
         ['work0', 'work1'],
@@ -246,7 +248,7 @@ def test_start_and_join_all(setup_disk_work_queue_start_ready):
     assert errors == [('work4', 'Error text')]
     assert q._running == 0
     assert len(q._finished) == len(q._work)
-    assert all(not x for x in q._busy_devices.values())
+    assert not q._busy_devices
 
 
 def test_start_and_join_all_interruptable(capsys, monkeypatch):
@@ -289,6 +291,51 @@ def test_get_device_identifier_uses_pardir_if_nonexistant():
     assert dwq.get_device_identifier(path) == expected
 
 
+def test_get_device_identifier_existing_path_single_stat(tmp_path, monkeypatch):
+    path = tmp_path / 'a' / 'b' / 'c'
+    path.mkdir(parents=True)
+    stat, lstat = os.stat, os.lstat
+    calls: List[str] = []
+
+    def patched_stat(p, *args, **kwargs):
+        calls.append('stat')
+        return stat(p, *args, **kwargs)
+
+    def patched_lstat(p, *args, **kwargs):
+        calls.append('lstat')
+        return lstat(p, *args, **kwargs)
+
+    monkeypatch.setattr(dwq.os, 'stat', patched_stat)
+    monkeypatch.setattr(dwq.os, 'lstat', patched_lstat)
+    expected = stat(path).st_dev
+    assert dwq.get_device_identifier(str(path)) == expected
+    assert calls == ['stat']
+
+
+def test_get_device_identifier_follows_dangling_symlink(tmp_path, monkeypatch):
+    # link -> other/notyet, the device has to be the one of other/
+    # not of mnt/ where the link resides
+    (tmp_path / 'other').mkdir()
+    (tmp_path / 'mnt').mkdir()
+    link = tmp_path / 'mnt' / 'link'
+    try:
+        os.symlink(tmp_path / 'other' / 'notyet', link)
+    except OSError:
+        pytest.skip('symlinks not supported')
+
+    stat = os.stat
+    found: List[str] = []
+
+    def patched_stat(p, *args, **kwargs):
+        result = stat(p, *args, **kwargs)
+        found.append(p)
+        return result
+
+    monkeypatch.setattr(dwq.os, 'stat', patched_stat)
+    dwq.get_device_identifier(str(link / 'sub'))
+    assert found == [os.path.realpath(tmp_path / 'other')]
+
+
 def test_queue_will_not_block_if_item_never_ready(setup_disk_work_queue_start_ready):
     q, started, ready_map = setup_disk_work_queue_start_ready
     ready_map['work2'] = False
@@ -306,7 +353,29 @@ def test_queue_will_not_block_if_item_never_ready(setup_disk_work_queue_start_re
     assert errors == [('work4', 'Error text')]
     assert q._running == 0
     assert len(q._finished) == len(q._work) - 1
-    assert all(not x for x in q._busy_devices.values())
+    assert not q._busy_devices
+
+
+def test_start_ready_devices_stats_path_once_per_pass(monkeypatch) -> None:
+    calls: Dict[str, int] = {}
+
+    def get_devid(p: str) -> int:
+        calls[p] = calls.get(p, 0) + 1
+        return 0
+
+    monkeypatch.setattr(
+        'backup_helper.disk_work_queue.get_device_identifier', get_devid)
+
+    q = dwq.DiskWorkQueue(
+        lambda w: ['src', f'target{w}'], lambda w: w, lambda w: True,
+        work=[0, 1, 2])
+    q.start_ready_devices()
+    # work0 blocks device 0 for the other items, but 'src' is only
+    # stat'ed once during the pass
+    assert calls == {'src': 1, 'target0': 1, 'target1': 1, 'target2': 1}
+    # both paths are on device 0, only reserved once
+    assert q._work[0].involved_devices == (0,)
+    q.join()
 
 
 def test_queue_does_not_cache_device_ids(monkeypatch) -> None:
@@ -346,8 +415,114 @@ def test_queue_does_not_cache_device_ids(monkeypatch) -> None:
     q = dwq.DiskWorkQueue(get_paths, do_work, work_ready, work=[0, 1, 2, 3])
 
     q.start_ready_devices()
+    q.join()
     assert started == {0: True, 3: True}
     call += 1
 
     q.start_ready_devices()
+    q.join()
     assert started == {0: True, 1: True, 2: True, 3: True}
+
+
+def test_work_done_releases_reserved_devices(monkeypatch) -> None:
+    # path gets created by the work -> resolves to a different device after
+    calls = 0
+
+    def get_devid(p) -> int:
+        nonlocal calls
+        calls += 1
+        return 0 if calls == 1 else 1
+
+    monkeypatch.setattr(
+        'backup_helper.disk_work_queue.get_device_identifier', get_devid)
+
+    q = dwq.DiskWorkQueue(
+        lambda w: [w], lambda w: w, lambda w: True, work=['work0'])
+    q.start_ready_devices()
+    q.join()
+
+    assert q._work[0].involved_devices == (0,)
+    assert q._busy_devices == set()
+    assert calls == 1
+
+
+def test_start_ready_devices_only_checks_pending_items(
+        setup_disk_work_queue_start_ready) -> None:
+    q, _, _ = setup_disk_work_queue_start_ready
+    checked: List[str] = []
+
+    def is_ready(x: str) -> bool:
+        checked.append(x)
+        return True
+
+    q._work_ready_func = is_ready
+    q.start_ready_devices()
+    q.join()
+    assert [w.work for w in q._pending] == ['work2', 'work3', 'work4']
+
+    checked.clear()
+    q.start_ready_devices()
+    q.join()
+    # work0 and work1 were started in the first pass
+    assert checked == ['work2', 'work3', 'work4']
+    assert [w.work for w in q._pending] == ['work3', 'work4']
+
+
+def test_get_device_identifier_missing_root(monkeypatch):
+    def stat(p):
+        raise FileNotFoundError(p)
+
+    monkeypatch.setattr(dwq.os, 'stat', stat)
+    with pytest.raises(RuntimeError):
+        dwq.get_device_identifier(os.path.join('sfdkls', 'tsrfsdfsdfshfhfdg'))
+
+
+def test_max_workers(monkeypatch) -> None:
+    monkeypatch.setattr(
+        'backup_helper.disk_work_queue.get_device_identifier', lambda p: p)
+
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def do_work(w: int) -> int:
+        nonlocal active, max_active
+        with lock:
+            active += 1
+            max_active = max(max_active, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return w
+
+    q = dwq.DiskWorkQueue(
+        lambda w: [w], do_work, lambda w: True, work=[0, 1, 2, 3, 4],
+        max_workers=2)
+    q.start_ready_devices()
+    # only the started items reserve their devices
+    assert q._busy_devices == {0, 1}
+    assert [w.work for w in q._pending] == [2, 3, 4]
+    q.join()
+
+    success, errors = q.start_and_join_all()
+    assert sorted(success) == [0, 1, 2, 3, 4]
+    assert errors == []
+    assert max_active <= 2
+
+
+def test_close_shuts_down_worker_threads(monkeypatch) -> None:
+    monkeypatch.setattr(
+        'backup_helper.disk_work_queue.get_device_identifier', lambda p: p)
+    workers: List[threading.Thread] = []
+
+    def do_work(w: int) -> int:
+        workers.append(threading.current_thread())
+        return w
+
+    with dwq.DiskWorkQueue(
+            lambda w: [w], do_work, lambda w: True, work=[0, 1, 2]) as q:
+        success, errors = q.start_and_join_all()
+        assert sorted(success) == [0, 1, 2]
+
+    assert workers
+    assert not any(t.is_alive() for t in workers)
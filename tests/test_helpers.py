@@ -1,7 +1,7 @@
 import pytest
 import os
 
-from backup_helper import backup_helper
+from backup_helper.target import Target
 from backup_helper import helpers
 
 
@@ -22,7 +22,7 @@ def test_sanitize_filename(value: str, repl_char: str, expected: str):
     ('/foo/bar/baz.log.txt', 1, '/foo/bar/baz.log_0.txt'),
     ('/foo/bar/baz', 3, '/foo/bar/baz_2'),
 ])
-def test_sanitize_filename(fn: str, existing: int, expected: str, monkeypatch):
+def test_unique_filename(fn: str, existing: int, expected: str, monkeypatch):
     i = 0
 
     def patched(p):
@@ -40,13 +40,29 @@ def test_sanitize_filename(fn: str, existing: int, expected: str, monkeypatch):
     assert helpers.unique_filename(norm) == norm_expected
 
 
+def test_unique_filename_logarithmic_probes(monkeypatch):
+    existing = {os.path.normpath('/foo/bar/baz.log')} | {
+        os.path.normpath(f'/foo/bar/baz_{i}.log') for i in range(1000)}
+    calls = 0
+
+    def patched(p):
+        nonlocal calls
+        calls += 1
+        return p in existing
+
+    monkeypatch.setattr('backup_helper.helpers.os.path.exists', patched)
+    assert helpers.unique_filename(os.path.normpath('/foo/bar/baz.log')) == \
+        os.path.normpath('/foo/bar/baz_1000.log')
+    assert calls < 30
+
+
 def test_unique_iterator():
     a = [
-        backup_helper.Target('test/1', 'test1', False, True, None),
-        backup_helper.Target('test/1', 'test1', False, True, None),
-        backup_helper.Target('test/2', 'test2', False, True, None),
-        backup_helper.Target('test/2', 'test2', False, True, None),
-        backup_helper.Target('test/3', 'test3', False, True, None),
+        Target('test/1', 'test1', False, True, None),
+        Target('test/1', 'test1', False, True, None),
+        Target('test/2', 'test2', False, True, None),
+        Target('test/2', 'test2', False, True, None),
+        Target('test/3', 'test3', False, True, None),
     ]
 
     assert list(t.path for t in helpers.unique_iterator(a)) == [
@@ -67,3 +83,15 @@ def test_unique_iterator_custom_key():
     assert list(t for t in helpers.unique_iterator(a, key='bar')) == [
         a[0], a[1], a[4],
     ]
+
+
+def test_setup_thread_log_file_autoremove_removes_on_exception(tmp_path):
+    import logging
+    logger = logging.getLogger('test_autoremove')
+
+    with pytest.raises(RuntimeError):
+        with helpers.setup_thread_log_file_autoremove(
+                logger, str(tmp_path / 'test.log')):
+            raise RuntimeError
+
+    assert logger.handlers == []
@@ -34,12 +34,10 @@ from backup_helper import work
              "hash_log_file": "hash_file.log",
              "targets": [
                  {
-                     "version": 1, "type": "Target",
                      "path": os.path.abspath("/target1"), "alias": "tgt1", "transfered": False,
                      "verify": True, "verified": None,
                  },
                  {
-                     "version": 1, "type": "Target",
                      "path": os.path.abspath("/target2"), "alias": None, "transfered": True,
                      "verify": True,
                      "verified": {"checked": 4, "errors": 2, "missing": 1, "crc_errors": 1, "log_file": "/log2"},
@@ -52,10 +50,6 @@ from backup_helper import work
 def test_to_json(
         path, alias, hash_algorithm, hash_file, hash_log_file,
         targets, force_single_hash, blocklist, expected):
-    expected_default = {
-        "version": 1, "type": "Source",
-    }
-    expected.update(expected_default)
     s = Source(path, alias, hash_algorithm, hash_file,
                hash_log_file, {}, force_single_hash, blocklist)
     if targets:
@@ -76,17 +70,31 @@ def test_to_json(
         "hash_algorithm": "md5", "hash_file": "hash_file.md5",
         "hash_log_file": "hash_file.log",
         "targets": [
-            Target('/target1', 'tgt1', False, True, None),
-            Target('/target2', None, True, True,
-                   VerifiedInfo(checked=4, errors=2, missing=1, crc_errors=1, log_file='/log2'))
+            {
+                "version": 1, "type": "Target",
+                "path": os.path.abspath("/target1"), "alias": "tgt1", "transfered": False,
+                "verify": True, "verified": None,
+            },
+            {
+                "version": 1, "type": "Target",
+                "path": os.path.abspath("/target2"), "alias": None, "transfered": True,
+                "verify": True,
+                "verified": {"checked": 4, "errors": 2, "missing": 1, "crc_errors": 1, "log_file": "/log2"},
+            },
         ],
         "force_single_hash": True, "blocklist": ["foo", "bar"],
     },
-        Source('/src2', None, 'md5', 'hash_file.md5', 'hash_file.log', {},
-               True, ['foo', 'bar']),
+        Source('/src2', None, 'md5', 'hash_file.md5', 'hash_file.log', {
+            os.path.abspath('/target1'): Target(
+                '/target1', 'tgt1', False, True, None),
+            os.path.abspath('/target2'): Target(
+                '/target2', None, True, True,
+                VerifiedInfo(checked=4, errors=2, missing=1, crc_errors=1, log_file='/log2')),
+        }, True, ['foo', 'bar']),
     )
 ])
 def test_from_json(json_obj, expected: Source):
+    # old state files still contain the header for each object
     json_default = {
         "version": 1, "type": "Source",
     }
@@ -100,12 +108,12 @@ def test_from_json(json_obj, expected: Source):
     assert s.force_single_hash == expected.force_single_hash
     assert s.blocklist == expected.blocklist
 
-    for t, expected in zip(s.unique_targets(), json_obj['targets']):
+    assert len(s.targets) == len(expected.targets)
+    for t, expected in zip(s.unique_targets(), expected.unique_targets()):
         cast(Target, t)
         cast(Target, expected)
         if expected.alias:
-            assert s.targets[t.alias] is not None
-            assert s.targets[t.alias] is s.targets[t.path]
+            assert s.get_target(t.alias) is s.targets[t.path]
 
         assert t.path == expected.path
         assert t.alias == expected.alias
@@ -117,7 +125,7 @@ def test_from_json(json_obj, expected: Source):
 @pytest.mark.parametrize('field,value,expected', [
     ('path', 'foo', 'foo'),
     ('alias', 'foo', 'foo'),
-    ('hash_algorithm', 'foo', 'foo'),
+    ('hash_algorithm', 'md5', 'md5'),
     ('hash_file', 'foo', 'foo'),
     ('hash_log_file', 'foo', 'foo'),
     ('force_single_hash', 'yes', True),
@@ -138,6 +146,14 @@ def test_set_modifiable_field_unkown_field():
         s.set_modifiable_field('fsdlkfjsdsl', 'sdfs')
 
 
+@pytest.mark.parametrize('value', ['foo', 'shake_128'])
+def test_set_modifiable_field_unsupported_hash_algorithm(value: str):
+    s = Source('test', None, 'md5', None, None, {})
+    with pytest.raises(ValueError):
+        s.set_modifiable_field('hash_algorithm', value)
+    assert s.hash_algorithm == 'md5'
+
+
 def test_set_modifiable_field_multivalue():
     s = Source('test', None, None, None, None, {})
     value = ['foo', 'bar']
@@ -185,9 +201,9 @@ def test_add_target():
     s.add_target(target1)
     s.add_target(target2)
 
-    assert len(s.targets) == 3
+    assert len(s.targets) == 2
     assert s.targets[target1.path] is target1
-    assert s.targets[target1.alias] is target1
+    assert s._target_aliases[target1.alias] == target1.path
     assert s.targets[target2.path] is target2
 
 
@@ -555,9 +571,9 @@ def test_hash_isolated_log_in_threads(patched_strftime, patched_sanitize, tmp_pa
 @patch('backup_helper.source.time.strftime', **{'return_value': 'footime'})
 def test_hash_file_contents(patched_strftime, patched_sanitize, tmp_path):
     tmp = tmp_path
-    hash_dir, _, src1, file_hashes = setup_src_to_hash(tmp, 'test1')
+    hash_dir, hash_log_dir, src1, file_hashes = setup_src_to_hash(tmp, 'test1')
 
-    src1.hash()
+    src1.hash(log_directory=hash_log_dir)
 
     hf = ChecksumHelperData(None, hash_dir / 'test1_bh_footime.cshd')
     hf.read()
@@ -149,19 +149,13 @@ def test_stage_add_targets(setup):
                      'targets': [{'alias': 'src1_target1_alias',
                                   'path': src1_target1_dir,
                                   'transfered': False,
-                                  'type': 'Target',
                                   'verified': None,
-                                  'verify': True,
-                                  'version': 1},
+                                  'verify': True},
                                  {'alias': 'src1_target2_alias',
                                   'path': src1_target2_dir,
                                   'transfered': False,
-                                  'type': 'Target',
                                   'verified': None,
-                                  'verify': False,
-                                  'version': 1}],
-                     'type': 'Source',
-                     'version': 1},
+                                  'verify': False}]},
                     {'alias': 'src2_alias',
                      'blocklist': [],
                      'force_single_hash': False,
@@ -172,14 +166,10 @@ def test_stage_add_targets(setup):
                      'targets': [{'alias': 'src2_target1_alias',
                                   'path': src2_target1_dir,
                                   'transfered': False,
-                                  'type': 'Target',
                                   'verified': None,
-                                  'verify': True,
-                                  'version': 1}],
-                     'type': 'Source',
-                     'version': 1}],
+                                  'verify': True}]}],
         'type': 'BackupHelper',
-        'version': 1,
+        'version': 2,
     }
 
 
@@ -320,7 +310,6 @@ def test_stage_hash_transfer_verify(setup):
                      'targets': [{'alias': 'src1_target1_alias',
                                   'path': src1_target1_dir,
                                   'transfered': True,
-                                  'type': 'Target',
                                   'verified': {
                                       'checked': src1_target1.verified.checked,
                                       'errors': src1_target1.verified.errors,
@@ -328,17 +317,12 @@ def test_stage_hash_transfer_verify(setup):
                                       'crc_errors': src1_target1.verified.crc_errors,
                                       'log_file': src1_target1.verified.log_file,
                                   },
-                                  'verify': True,
-                                  'version': 1},
+                                  'verify': True},
                                  {'alias': 'src1_target2_alias',
                                   'path': src1_target2_dir,
                                   'transfered': True,
-                                  'type': 'Target',
                                   'verified': None,
-                                  'verify': False,
-                                  'version': 1}],
-                     'type': 'Source',
-                     'version': 1},
+                                  'verify': False}]},
                     {'alias': 'src2_alias',
                      'blocklist': [],
                      'force_single_hash': False,
@@ -349,7 +333,6 @@ def test_stage_hash_transfer_verify(setup):
                      'targets': [{'alias': 'src2_target1_alias',
                                   'path': src2_target1_dir,
                                   'transfered': True,
-                                  'type': 'Target',
                                   'verified': {
                                       'checked': src2_target1.verified.checked,
                                       'errors': src2_target1.verified.errors,
@@ -357,12 +340,9 @@ def test_stage_hash_transfer_verify(setup):
                                       'crc_errors': src2_target1.verified.crc_errors,
                                       'log_file': src2_target1.verified.log_file,
                                   },
-                                  'verify': True,
-                                  'version': 1}],
-                     'type': 'Source',
-                     'version': 1}],
+                                  'verify': True}]}],
         'type': 'BackupHelper',
-        'version': 1,
+        'version': 2,
     }
 
 
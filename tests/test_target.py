@@ -21,10 +21,6 @@ from backup_helper.target import Target, VerifiedInfo
      }),
 ])
 def test_to_json(path, alias, transfered, verify, verified, expected):
-    expected_default = {
-        "version": 1, "type": "Target",
-    }
-    expected.update(expected_default)
     t = Target(path, alias, transfered, verify, verified)
     assert t.to_json() == expected
 
@@ -44,6 +40,7 @@ def test_to_json(path, alias, transfered, verify, verified, expected):
     ),
 ])
 def test_from_json(json_obj, expected):
+    # old state files still contain the header for each object
     json_default = {
         "version": 1, "type": "Target",
     }